@@ -1,13 +1,104 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import csv
+import gzip
 import json
+import shutil
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 BITQUERY_URL = "https://streaming.bitquery.io/graphql"
-BATCH_SIZE = 10000 
+BATCH_SIZE = 10000
 RECORDS_PER_FILE = 20000
 CONFIG_FILE = "config.json"
+COMBINED_FILENAME = 'token_buys_ALL_COMBINED.csv'
+# False = write straight into the master file (half the disk I/O),
+# True = keep the old token_buys_fileN.csv splits and combine at the end
+WRITE_SPLIT_FILES = False
+# gzip-compress the output CSVs (~4-5x smaller on these rows);
+# filenames get a .gz suffix
+GZIP_OUTPUT = False
+GZIP_LEVEL = 4
+# 'csv', 'parquet' or 'both' - parquet needs pyarrow (pip install pyarrow)
+# and is ~4x smaller / much faster to load for analysis
+OUTPUT_FORMAT = 'csv'
+PARQUET_FILENAME = 'token_buys_ALL_COMBINED.parquet'
+# >1 splits the token's history into that many disjoint time windows and
+# fetches them concurrently (CSV output only; mind your API rate limits)
+PARALLEL_WINDOWS = 1
+
+def output_filename(base):
+    """Final on-disk name for a CSV, with .gz suffix when compression is on"""
+    return base + '.gz' if GZIP_OUTPUT else base
+
+def open_csv_write(filename):
+    """Open a CSV for writing, gzip-compressed if the name ends in .gz"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'wt', newline='', encoding='utf-8', compresslevel=GZIP_LEVEL)
+    return open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+
+REQUEST_TIMEOUT = (5, 60)
+
+# one session for the whole run so we keep the TCP/TLS connection alive
+# between batches instead of doing a fresh handshake every request
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=8,
+        backoff_factor=1.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['POST'],
+        respect_retry_after_header=True
+    )
+))
+# extra attempts in the batch loop itself, on top of the adapter retries,
+# so one bad stretch doesn't throw away hours of fetching
+MAX_FETCH_RETRIES = 3
+# GraphQL responses are full of repeated keys and compress ~5-10x;
+# urllib3 decodes transparently so we just ask for it (no br - we don't
+# ship a brotli decoder, so advertising it could leave content undecoded)
+SESSION.headers.update({"Accept-Encoding": "gzip, deflate"})
+
+# only pause between batches when the API says we're close to the limit
+# (429s themselves are retried with backoff by the session adapter)
+RATE_LIMIT_THRESHOLD = 5
+_rate_limit_remaining = None
+
+def _note_rate_limit(response):
+    """Remember the X-RateLimit-Remaining header from the last response"""
+    global _rate_limit_remaining
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    if remaining is not None:
+        try:
+            _rate_limit_remaining = int(remaining)
+        except ValueError:
+            _rate_limit_remaining = None
+
+def rate_limit_pause():
+    """Sleep between batches only when needed (no header = conservative 1s)"""
+    if _rate_limit_remaining is not None and _rate_limit_remaining > RATE_LIMIT_THRESHOLD:
+        return
+    time.sleep(1)
+
+def set_session_api_key(api_key):
+    """Set the auth headers on the shared session (call once after login)"""
+    SESSION.headers.update({
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    })
 
 def load_api_key():
     """Load API key from config file if it exists"""
@@ -28,21 +119,39 @@ def save_api_key(api_key):
     except:
         pass
 
-def get_total_buys(token_address, api_key):
-    """Get the total number of buy transactions for a token"""
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
+QUERY_TOTAL = """
+    query GetTotalBuys($mint: String!) {
+      Solana(dataset: realtime) {
+        DEXTradeByTokens(
+          where: {
+            Trade: {
+              Currency: {
+                MintAddress: {is: $mint}
+              }
+              Side: {
+                Type: {is: buy}
+              }
+            }
+            Transaction: {Result: {Success: true}}
+          }
+          limit: {count: 1}
+        ) {
+          Block {
+            Time
+          }
+        }
+      }
     }
-    
-    query = """
-    query GetTotalBuys {
+    """
+
+QUERY_FIRST_TRADE = """
+    query GetFirstTrade($mint: String!) {
       Solana(dataset: realtime) {
         DEXTradeByTokens(
           where: {
             Trade: {
               Currency: {
-                MintAddress: {is: "%s"}
+                MintAddress: {is: $mint}
               }
               Side: {
                 Type: {is: buy}
@@ -50,6 +159,7 @@ def get_total_buys(token_address, api_key):
             }
             Transaction: {Result: {Success: true}}
           }
+          orderBy: {ascendingByField: "Block_Time"}
           limit: {count: 1}
         ) {
           Block {
@@ -58,42 +168,53 @@ def get_total_buys(token_address, api_key):
         }
       }
     }
-    """ % token_address
-    
+    """
+
+def get_first_trade_time(token_address):
+    """Get the timestamp of the token's oldest buy (for window sharding)"""
+    try:
+        payload = {"query": QUERY_FIRST_TRADE, "variables": {"mint": token_address}}
+        response = SESSION.post(BITQUERY_URL, data=orjson.dumps(payload), timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+
+        trades = data.get('data', {}).get('Solana', {}).get('DEXTradeByTokens') or []
+        if not trades:
+            return None
+        return trades[0]['Block']['Time']
+
+    except Exception as e:
+        print(f"Error getting first trade time: {str(e)}")
+        return None
+
+def get_total_buys(token_address, api_key):
+    """Get the total number of buy transactions for a token"""
     try:
         print("Checking token buy transactions...")
-        response = requests.post(BITQUERY_URL, json={"query": query}, headers=headers)
+        payload = {"query": QUERY_TOTAL, "variables": {"mint": token_address}}
+        response = SESSION.post(BITQUERY_URL, data=orjson.dumps(payload), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
-        
+        data = orjson.loads(response.content)
+
         if 'errors' in data:
             print("Error from Bitquery:")
             print(json.dumps(data['errors'], indent=2))
             return None
-        
+
         return "Unknown total (will count during fetch)"
     
     except Exception as e:
         print(f"Error: {str(e)}")
         return None
 
-def fetch_batch(token_address, api_key, before_timestamp=None):
-    """Fetch in batch of 10,000 buy transactions"""
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    time_filter = f'Time: {{before: "{before_timestamp}"}}' if before_timestamp else ''
-    
-    query = """
-    query GetBatch {
+QUERY_BATCH = """
+    query GetBatch($mint: String!, $since: DateTime, $till: DateTime, $limit: Int!) {
       Solana(dataset: realtime) {
         DEXTradeByTokens(
           where: {
             Trade: {
               Currency: {
-                MintAddress: {is: "%s"}
+                MintAddress: {is: $mint}
               }
               Side: {
                 Type: {is: buy}
@@ -101,11 +222,11 @@ def fetch_batch(token_address, api_key, before_timestamp=None):
             }
             Transaction: {Result: {Success: true}}
             Block: {
-              %s
+              Time: {since: $since, till: $till}
             }
           }
           orderBy: {descendingByField: "Block_Time"}
-          limit: {count: %d}
+          limit: {count: $limit}
         ) {
           Block {
             Time
@@ -133,62 +254,305 @@ def fetch_batch(token_address, api_key, before_timestamp=None):
         }
       }
     }
-    """ % (token_address, time_filter, BATCH_SIZE)
-    
+    """
+
+def fetch_batch(token_address, api_key, before_timestamp=None, since_timestamp=None):
+    """Fetch in batch of 10,000 buy transactions at or before before_timestamp
+    (optionally bounded below by since_timestamp, for windowed fetching)
+
+    The cursor is inclusive (till) so trades sharing the boundary block
+    timestamp are never skipped; the caller drops the already-seen
+    signatures from the overlap instead"""
     try:
-        response = requests.post(BITQUERY_URL, json={"query": query}, headers=headers)
+        payload = {
+            "query": QUERY_BATCH,
+            "variables": {"mint": token_address, "since": since_timestamp,
+                          "till": before_timestamp, "limit": BATCH_SIZE}
+        }
+        response = SESSION.post(BITQUERY_URL, data=orjson.dumps(payload), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
-        
+        _note_rate_limit(response)
+        data = orjson.loads(response.content)
+
         if 'errors' in data:
             print("Error from Bitquery:")
             print(json.dumps(data['errors'], indent=2))
             return None
-        
+
         trades = data['data']['Solana']['DEXTradeByTokens']
+
+        # normalize the paid amounts to floats once at parse time so the
+        # CSV hot loop doesn't redo the lookup-and-branch for every row
+        for t in trades:
+            side = t['Trade']['Side']
+            t['_paid'] = float(side.get('Amount') or 0.0)
+            t['_paid_usd'] = float(side.get('AmountInUSD') or 0.0)
+
         return trades
     
     except Exception as e:
         print(f"Error fetching batch: {str(e)}")
         return None
 
-def save_to_csv(trades, filename):
-    """Saving trades to a CSV file"""
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Timestamp', 'Buyer_Wallet', 'Token_Amount', 'Amount_Paid_SOL', 'Amount_Paid_USD', 'Transaction_Signature', 'Signer'])
-        
-        for trade in trades:
-            
-            amount_paid = trade['Trade']['Side'].get('Amount', 0) if trade['Trade']['Side'].get('Amount') else 0
-            amount_paid_usd = trade['Trade']['Side'].get('AmountInUSD', 0) if trade['Trade']['Side'].get('AmountInUSD') else 0
-            
-            writer.writerow([
-                trade['Block']['Time'],
-                trade['Trade']['Account']['Address'],
-                trade['Trade']['Amount'],
-                amount_paid,
-                amount_paid_usd,
-                trade['Transaction']['Signature'],
-                trade['Transaction']['Signer']
-            ])
+CSV_HEADER = ['Timestamp', 'Buyer_Wallet', 'Token_Amount', 'Amount_Paid_SOL', 'Amount_Paid_USD', 'Transaction_Signature', 'Signer']
+
+class CsvRotatingWriter:
+    """Streams trades straight to disk so we never hold more than one batch
+    in memory. With split_files=True it rotates to a new CSV file every
+    RECORDS_PER_FILE rows; otherwise everything goes into the master file
+    and the rotation counter only drives progress output"""
+
+    def __init__(self, records_per_file=RECORDS_PER_FILE, split_files=WRITE_SPLIT_FILES, filename=None):
+        self.records_per_file = records_per_file
+        self.split_files = split_files
+        self.filename = filename
+        self.file_num = 0
+        self.rows_in_file = 0
+        self.total_rows = 0
+        self.rows_per_file = {}
+        self.filenames = []
+        self._file = None
+        self._writer = None
+
+    def _open_next_file(self):
+        self.file_num += 1
+        if self.filename:
+            filename = self.filename
+        elif self.split_files:
+            filename = output_filename(f'token_buys_file{self.file_num}.csv')
+        else:
+            filename = output_filename(COMBINED_FILENAME)
+        self._file = open_csv_write(filename)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+        self.rows_in_file = 0
+        self.filenames.append(filename)
+
+    def _finish_current_file(self):
+        if self.split_files:
+            self._file.close()
+            self._file = None
+            self._writer = None
+        print(f"   Saved {self.rows_in_file:,} trades to: {self.filenames[-1]}")
+        self.rows_in_file = 0
+        if not self.split_files:
+            self.file_num += 1
+
+    def write_rows(self, trades):
+        """Write one batch of trades (as returned by fetch_batch, with the
+        normalized _paid fields), rotating files as needed"""
+        i = 0
+        while i < len(trades):
+            if self._writer is None:
+                self._open_next_file()
+
+            # write as much of the batch as fits in the current file
+            take = min(len(trades) - i, self.records_per_file - self.rows_in_file)
+            out = self._file
+            for j in range(i, i + take):
+                t = trades[j]
+                row = (t['Block']['Time'],
+                       t['Trade']['Account']['Address'],
+                       t['Trade']['Amount'],
+                       format(t['_paid'], '.9g'),
+                       format(t['_paid_usd'], '.9g'),
+                       t['Transaction']['Signature'],
+                       t['Transaction']['Signer'])
+                # the schema is fixed (timestamps, base58 addresses, numbers)
+                # so a plain join skips csv.writer's quoting state machine;
+                # fall back to csv.writer for the rare field that needs quoting
+                if any(type(v) is str and (',' in v or '"' in v or '\n' in v) for v in row):
+                    self._writer.writerow(row)
+                else:
+                    out.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]},{row[5]},{row[6]}\r\n")
+            self.rows_in_file += take
+            self.total_rows += take
+            filename = self.filenames[-1]
+            self.rows_per_file[filename] = self.rows_per_file.get(filename, 0) + take
+            i += take
+
+            if self.rows_in_file >= self.records_per_file:
+                self._finish_current_file()
+
+    def close(self):
+        if self._file is None:
+            return
+        if self.rows_in_file > 0:
+            self._finish_current_file()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+def trades_to_arrow_table(trades):
+    """Build a typed Arrow table (one column array per CSV field) from a batch"""
+    times, wallets, amounts, paid, paid_usd, sigs, signers = [], [], [], [], [], [], []
+    for trade in trades:
+        times.append(trade['Block']['Time'])
+        wallets.append(trade['Trade']['Account']['Address'])
+        amounts.append(float(trade['Trade']['Amount'] or 0))
+        paid.append(float(trade['Trade']['Side'].get('Amount') or 0))
+        paid_usd.append(float(trade['Trade']['Side'].get('AmountInUSD') or 0))
+        sigs.append(trade['Transaction']['Signature'])
+        signers.append(trade['Transaction']['Signer'])
+
+    return pa.Table.from_pydict({
+        'Timestamp': pa.array(times, type=pa.string()),
+        'Buyer_Wallet': pa.array(wallets, type=pa.string()),
+        'Token_Amount': pa.array(amounts, type=pa.float64()),
+        'Amount_Paid_SOL': pa.array(paid, type=pa.float64()),
+        'Amount_Paid_USD': pa.array(paid_usd, type=pa.float64()),
+        'Transaction_Signature': pa.array(sigs, type=pa.string()),
+        'Signer': pa.array(signers, type=pa.string()),
+    })
+
+class ParquetStreamWriter:
+    """Streams batches as row groups into one Parquet file. zstd plus
+    dictionary encoding compresses the repeated wallet addresses very well"""
+
+    def __init__(self, filename=PARQUET_FILENAME):
+        self.filename = filename
+        self.rows_written = 0
+        self._writer = None
+
+    def write_rows(self, trades):
+        table = trades_to_arrow_table(trades)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                self.filename, table.schema,
+                compression='zstd', use_dictionary=True
+            )
+        self._writer.write_table(table, row_group_size=RECORDS_PER_FILE)
+        self.rows_written += len(trades)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            print(f"   Saved {self.rows_written:,} trades to: {self.filename}")
+
+def save_to_parquet(trades, filename):
+    """One-shot Parquet export of a list of trades"""
+    tbl = trades_to_arrow_table(trades)
+    pq.write_table(tbl, filename, compression='zstd', use_dictionary=True,
+                   row_group_size=RECORDS_PER_FILE)
 
 def combine_csv_files(input_files, output_file):
-    """Combining multiple CSV files into one"""
-    with open(output_file, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.writer(outfile)
-        writer.writerow(['Timestamp', 'Buyer_Wallet', 'Token_Amount', 'Amount_Paid_SOL', 'Amount_Paid_USD', 'Transaction_Signature', 'Signer'])
-        
+    """Combining multiple CSV files into one (raw byte copy, no re-parsing)"""
+    if output_file.endswith('.gz'):
+        outfile = gzip.open(output_file, 'wb', compresslevel=GZIP_LEVEL)
+    else:
+        outfile = open(output_file, 'wb')
+
+    with outfile:
+        outfile.write((','.join(CSV_HEADER) + '\r\n').encode('utf-8'))
+
         for filename in input_files:
             try:
-                with open(filename, 'r', encoding='utf-8') as infile:
-                    reader = csv.reader(infile)
-                    next(reader)  
-                    for row in reader:
-                        writer.writerow(row)
+                opener = gzip.open if filename.endswith('.gz') else open
+                with opener(filename, 'rb') as infile:
+                    infile.readline()  # skip the header line
+                    shutil.copyfileobj(infile, outfile, length=1 << 20)
             except FileNotFoundError:
                 print(f"File not found: {filename}")
 
+def _parse_block_time(ts):
+    return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+
+def _format_block_time(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def export_window(token_address, api_key, since, till, filename, window_num):
+    """Fetch every buy in [since, till] into one part file (newest first).
+
+    Same cursor/dedupe/retry logic as the sequential loop, just bounded
+    below by the window start. Returns (rows_written, api_calls)"""
+    # split_files must be off here no matter what WRITE_SPLIT_FILES says:
+    # rotating would reopen the fixed part filename in 'w' mode and
+    # truncate everything written so far
+    writer = CsvRotatingWriter(split_files=False, filename=filename)
+    cursor = till
+    boundary_sigs = set()
+    failures = 0
+    api_calls = 0
+
+    while True:
+        trades = fetch_batch(token_address, api_key, cursor, since)
+        api_calls += 1
+
+        if trades is None:
+            failures += 1
+            if failures > MAX_FETCH_RETRIES:
+                print(f"   Window {window_num}: giving up after repeated fetch failures.")
+                break
+            time.sleep(min(60, 5 * 2 ** (failures - 1)))
+            continue
+
+        failures = 0
+        fetched_count = len(trades)
+        if boundary_sigs:
+            trades = [t for t in trades if t['Transaction']['Signature'] not in boundary_sigs]
+        if not trades:
+            break
+
+        writer.write_rows(trades)
+        cursor = trades[-1]['Block']['Time']
+        boundary_sigs = {t['Transaction']['Signature'] for t in trades
+                         if t['Block']['Time'] == cursor}
+
+        if fetched_count < BATCH_SIZE:
+            break
+
+        rate_limit_pause()
+
+    writer.close()
+    print(f"   Window {window_num} done: {writer.total_rows:,} trades")
+    return writer.total_rows, api_calls
+
+def export_parallel(token_address, api_key, num_windows):
+    """Shard the token's history into disjoint time windows, fetch them
+    concurrently over the shared session, and concatenate the part files
+    into the master CSV. Returns (total_rows, api_calls), or None when the
+    first-trade time can't be determined (caller falls back to sequential)"""
+    first = get_first_trade_time(token_address)
+    if first is None:
+        return None
+
+    t_start = _parse_block_time(first)
+    t_end = datetime.now(timezone.utc)
+    span = (t_end - t_start) / num_windows
+
+    # newest window first so concatenating the parts keeps the output
+    # ordered newest-to-oldest, same as the sequential path
+    windows = []
+    for k in range(num_windows):
+        till = t_end - span * k
+        if k == num_windows - 1:
+            since = t_start
+        else:
+            # +1s keeps the windows disjoint (block times have 1s granularity)
+            since = t_end - span * (k + 1) + timedelta(seconds=1)
+        windows.append((_format_block_time(since), _format_block_time(till)))
+
+    part_files = [output_filename(f'token_buys_part{k + 1}.csv') for k in range(num_windows)]
+
+    print(f"Fetching {num_windows} time windows in parallel...")
+    with ThreadPoolExecutor(max_workers=num_windows) as pool:
+        futures = [pool.submit(export_window, token_address, api_key, since, till, part, k + 1)
+                   for k, ((since, till), part) in enumerate(zip(windows, part_files))]
+        results = [f.result() for f in futures]
+
+    combine_csv_files(part_files, output_filename(COMBINED_FILENAME))
+    for part in part_files:
+        try:
+            os.remove(part)
+        except FileNotFoundError:
+            pass
+
+    total_rows = sum(r[0] for r in results)
+    api_calls = sum(r[1] for r in results)
+    return total_rows, api_calls
+
 
 
 def main():
@@ -220,7 +584,9 @@ def main():
     if not api_key:
         print("API key cannot be empty!")
         return
-    
+
+    set_session_api_key(api_key)
+
     print()
     
     print("STEP 2: Token Contract Address")
@@ -247,8 +613,11 @@ def main():
     
     print("=" * 70)
     print("this script will fetch ALL buy transactions for this token and save them to CSV files.")
-    print(f"Files will be saved as: token_buys_file1.csv, token_buys_file2.csv, etc.")
-    print(f"{RECORDS_PER_FILE:,} records per file")
+    if WRITE_SPLIT_FILES:
+        print(f"Files will be saved as: token_buys_file1.csv, token_buys_file2.csv, etc.")
+        print(f"{RECORDS_PER_FILE:,} records per file")
+    else:
+        print(f"Everything will be saved to: {output_filename(COMBINED_FILENAME)}")
     print("=" * 70)
     
     start = input("\nStart fetching? (yes/no): ").strip().lower()
@@ -262,90 +631,150 @@ def main():
     print("starting to fetch...")
     print("=" * 70)
     print()
-    
-    all_trades = []
+
+    if PARALLEL_WINDOWS > 1:
+        result = export_parallel(token_address, api_key, PARALLEL_WINDOWS)
+        if result is not None:
+            total_records, api_calls = result
+            combined_filename = output_filename(COMBINED_FILENAME)
+            print()
+            print(f"Master file created: {combined_filename}")
+            print()
+            print("=" * 70)
+            print("EXPORT COMPLETE!")
+            print("=" * 70)
+            print(f"Total buy transactions fetched: {total_records:,}")
+            print(f"Total API calls made: {api_calls}")
+            print(f"\nFiles created:")
+            print(f"   1. {combined_filename} ({total_records:,} records)  MASTER FILE")
+            print()
+            print("=" * 70)
+            return
+        print("Could not determine the first trade time, falling back to sequential fetch.")
+        print()
+
     batch_num = 1
     last_timestamp = None
-    batch_files = []
-    file_num = 1
     total_fetched = 0
-    
-    while True:
-        print(f"Fetching batch #{batch_num}...", end=" ")
-        
-        trades = fetch_batch(token_address, api_key, last_timestamp)
-        
-        if not trades:
-            print("Failed to fetch / no more data.")
-            break
-        
-        if len(trades) == 0:
-            print("No more trades!")
-            break
-        
-        print(f"{len(trades):,} trades")
-        all_trades.extend(trades)
-        total_fetched += len(trades)
-        
-        if len(all_trades) >= RECORDS_PER_FILE:
-            filename = f'token_buys_file{file_num}.csv'
-            trades_to_save = all_trades[:RECORDS_PER_FILE]
-            save_to_csv(trades_to_save, filename)
-            batch_files.append(filename)
-            print(f"   Saved {len(trades_to_save):,} trades to: {filename}")
-            print(f"   Total fetched so far: {total_fetched:,}")
-            
-            all_trades = all_trades[RECORDS_PER_FILE:]
-            file_num += 1
-        
-        last_timestamp = trades[-1]['Block']['Time']
-        
-        if len(trades) < BATCH_SIZE:
-            print("   Reached end of data")
-            break
-        
-        batch_num += 1
-        time.sleep(1)  
-      
-    if len(all_trades) > 0:
-        filename = f'token_buys_file{file_num}.csv'
-        save_to_csv(all_trades, filename)
-        batch_files.append(filename)
-        print(f"Saved remaining {len(all_trades):,} trades to: {filename}")
-    
+
+    csv_writer = None
+    parquet_writer = None
+    if OUTPUT_FORMAT in ('parquet', 'both') and pq is None:
+        print("pyarrow is not installed - falling back to CSV output (pip install pyarrow)")
+    elif OUTPUT_FORMAT in ('parquet', 'both'):
+        parquet_writer = ParquetStreamWriter()
+    if OUTPUT_FORMAT in ('csv', 'both') or parquet_writer is None:
+        csv_writer = CsvRotatingWriter()
+    writers = [w for w in (csv_writer, parquet_writer) if w is not None]
+
+    # prefetch pipeline: while we write one batch to disk, the next batch is
+    # already downloading on the second thread (only one request in flight at
+    # a time, so ordering is preserved)
+    boundary_sigs = set()
+    fetch_failures = 0
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        future_next = pool.submit(fetch_batch, token_address, api_key, last_timestamp)
+
+        while True:
+            print(f"Fetching batch #{batch_num}...", end=" ")
+
+            trades = future_next.result()
+
+            # None means a network/API error (the adapter already retried);
+            # an empty list means we really ran out of data
+            if trades is None:
+                fetch_failures += 1
+                if fetch_failures > MAX_FETCH_RETRIES:
+                    print("Giving up after repeated fetch failures.")
+                    break
+                wait = min(60, 5 * 2 ** (fetch_failures - 1))
+                print(f"Fetch failed, retrying in {wait}s ({fetch_failures}/{MAX_FETCH_RETRIES})...")
+                time.sleep(wait)
+                future_next = pool.submit(fetch_batch, token_address, api_key, last_timestamp)
+                continue
+
+            fetch_failures = 0
+
+            if not trades:
+                print("No more trades!")
+                break
+
+            # the inclusive cursor re-fetches trades at the boundary
+            # timestamp, so drop the ones we already wrote
+            fetched_count = len(trades)
+            if boundary_sigs:
+                trades = [t for t in trades if t['Transaction']['Signature'] not in boundary_sigs]
+            if not trades:
+                print("No more trades!")
+                break
+
+            print(f"{len(trades):,} trades")
+            last_timestamp = trades[-1]['Block']['Time']
+            boundary_sigs = {t['Transaction']['Signature'] for t in trades
+                             if t['Block']['Time'] == last_timestamp}
+
+            if fetched_count == BATCH_SIZE:
+                future_next = pool.submit(fetch_batch, token_address, api_key, last_timestamp)
+
+            for w in writers:
+                w.write_rows(trades)
+            total_fetched += len(trades)
+
+            if fetched_count < BATCH_SIZE:
+                print("   Reached end of data")
+                break
+
+            batch_num += 1
+            rate_limit_pause()
+
+    for w in writers:
+        w.close()
+    batch_files = csv_writer.filenames if csv_writer else []
+
     print()
     
+    combined_filename = output_filename(COMBINED_FILENAME)
+    total_records = 0
+
     if len(batch_files) > 0:
-        print("=" * 70)
-        print("Combining all files into one file...")
-        print("=" * 70)
-        
-        combined_filename = 'token_buys_ALL_COMBINED.csv'
-        combine_csv_files(batch_files, combined_filename)
-        
-        total_records = 0
-        with open(combined_filename, 'r', encoding='utf-8') as f:
-            total_records = sum(1 for line in f) - 1
-        
+        if WRITE_SPLIT_FILES:
+            print("=" * 70)
+            print("Combining all files into one file...")
+            print("=" * 70)
+            combine_csv_files(batch_files, combined_filename)
+
+        total_records = csv_writer.total_rows
+
         print(f"Master file created: {combined_filename}")
         print()
-    
+
+    if parquet_writer is not None:
+        if total_records == 0:
+            total_records = parquet_writer.rows_written
+        print(f"Parquet file created: {parquet_writer.filename}")
+        print()
+
     print("=" * 70)
     print("EXPORT COMPLETE!")
     print("=" * 70)
     print(f"Total buy transactions fetched: {total_records:,}")
     print(f"Total API calls made: {batch_num - 1}")
     print(f"\nFiles created:")
-    
-    for i, filename in enumerate(batch_files, 1):
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                count = sum(1 for line in f) - 1
-            print(f"   {i}. {filename} ({count:,} records)")
-        except:
-            print(f"   {i}. {filename}")
-    
-    print(f"   {len(batch_files) + 1}. {combined_filename} ({total_records:,} records)  MASTER FILE")
+
+    if WRITE_SPLIT_FILES:
+        for i, filename in enumerate(batch_files, 1):
+            count = csv_writer.rows_per_file.get(filename)
+            if count is not None:
+                print(f"   {i}. {filename} ({count:,} records)")
+            else:
+                print(f"   {i}. {filename}")
+
+        print(f"   {len(batch_files) + 1}. {combined_filename} ({total_records:,} records)  MASTER FILE")
+    elif csv_writer is not None:
+        print(f"   1. {combined_filename} ({total_records:,} records)  MASTER FILE")
+    if parquet_writer is not None:
+        print(f"   {parquet_writer.filename} ({parquet_writer.rows_written:,} records)  PARQUET")
     print()
     print("=" * 70)
  